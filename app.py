@@ -3,12 +3,13 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import timedelta
-from utils import load_data, hhmm_to_minutes, signed_circ_diff_minutes, require_passcode
+from utils import load_range, latest_date, load_anomalies, hhmm_to_minutes, signed_circ_diff_minutes, require_passcode, reload_button
 
 st.set_page_config(page_title='セルフケア・レポート', page_icon='📊', layout='wide')
 st.title('📊 セルフケア・レポート')
 
 require_passcode(page_name='report')
+reload_button('care-log')
 
 # 期間切替
 opts = ['7日','30日','90日','期間指定']
@@ -19,17 +20,12 @@ if sel == '期間指定':
     with c1: start_override = st.date_input('開始日')
     with c2: end_override = st.date_input('終了日')
 
-# データ読み込み
-df = load_data('care-log', None)
-if df is None or df.empty or '日付' not in df.columns:
+# データ読み込み（最終記録日から期間を決め、その範囲の年シートだけを読む）
+last_day = latest_date('care-log')
+if last_day is None:
     st.info('まだデータがありません。まずは入力ページから保存してください。')
     st.stop()
 
-df = df.copy()
-df['日付'] = pd.to_datetime(df['日付'], errors='coerce')
-df = df.dropna(subset=['日付']).sort_values('日付')
-
-last_day = df['日付'].max().normalize()
 if sel == '7日':
     start_day = last_day - timedelta(days=6)
 elif sel == '30日':
@@ -39,10 +35,13 @@ elif sel == '90日':
 else:
     start_day = pd.to_datetime(start_override) if start_override else last_day - timedelta(days=29)
     last_day  = pd.to_datetime(end_override) if end_override else last_day
+
+df = load_range(start_day, last_day, 'care-log')
+df = df.dropna(subset=['日付']).sort_values('日付')
 recent = df[df['日付'].between(start_day, last_day)].reset_index(drop=True)
 
 # ===== タブ切替 =====
-tab_sleep, tab_tlx = st.tabs(['睡眠（偏差/時間）', 'TLX'])
+tab_sleep, tab_tlx, tab_alert = st.tabs(['睡眠（偏差/時間）', 'TLX', 'アラート'])
 
 # ---- 共通関数（睡眠偏差＋睡眠時間偏差[7h基準]） ----
 BASE_SLEEP, BASE_WAKE = 21*60, 4*60
@@ -144,3 +143,16 @@ with tab_tlx:
         x='ディメンション:N', y='平均:Q', tooltip=['ディメンション','平均']
     )
     st.altair_chart(bar, use_container_width=True)
+
+with tab_alert:
+    st.caption('保存時に自動判定された外れ値（直近60日の中央値/MADによる修正zスコアが±3.5以上）を表示します。')
+    alerts = load_anomalies(start_day, last_day)
+    if alerts.empty:
+        st.caption('この期間にアラートはありません。')
+    else:
+        st.metric('アラート件数', f'{len(alerts)}')
+        st.dataframe(
+            alerts.assign(日付=alerts['日付'].dt.date),
+            hide_index=True, use_container_width=True,
+            column_config={c: st.column_config.NumberColumn(format='%.2f') for c in ['値','中央値','MAD','z']}
+        )
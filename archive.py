@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# archive.py — care-log 全年シートの一括エクスポート/インポート
+#   python archive.py export out/ --format parquet
+#   python archive.py import out/care-log_2024.csv --replace
+import os
+import sys
+import json
+import argparse
+import pandas as pd
+from utils import (
+    EXPECTED_HEADERS,
+    list_year_worksheets,
+    iter_sheet_chunks,
+    validate_rows,
+    normalize_rows,
+    get_sheet,
+    clear_data_rows,
+    append_rows_batched,
+)
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+def _parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("parquet 形式には pyarrow が必要です（pip install pyarrow）")
+    return pa, pq
+
+class _ChunkWriter:
+    def __init__(self, path, fmt):
+        self.path, self.fmt, self.rows = path, fmt, 0
+        if fmt == "parquet":
+            pa, pq = _parquet()
+            self.schema = pa.schema([(c, pa.string()) for c in EXPECTED_HEADERS])
+            self.f = pq.ParquetWriter(path, self.schema)
+        else:
+            self.f = open(path, "w", encoding="utf-8", newline="")
+            if fmt == "csv": pd.DataFrame(columns=EXPECTED_HEADERS).to_csv(self.f, index=False)
+
+    def write(self, df):
+        df = df[EXPECTED_HEADERS].astype("string").fillna("")
+        if self.fmt == "csv":
+            df.to_csv(self.f, index=False, header=False)
+        elif self.fmt == "jsonl":
+            for rec in df.to_dict("records"):
+                self.f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        else:
+            pa, _ = _parquet()
+            self.f.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        self.rows += len(df)
+
+    def close(self):
+        self.f.close()
+
+def export_archive(out_dir, fmt="csv", spreadsheet_name="care-log", years=None, chunk_rows=1000):
+    # 読み取り専用。ヘッダーが想定と違う年は修復せずに報告してスキップする
+    os.makedirs(out_dir, exist_ok=True)
+    failed = []
+    for y in years or list_year_worksheets(spreadsheet_name):
+        path = os.path.join(out_dir, f"{spreadsheet_name}_{y}.{fmt}")
+        w = _ChunkWriter(path, fmt)
+        try:
+            for chunk in iter_sheet_chunks(spreadsheet_name, y, chunk_rows):
+                w.write(chunk)
+        except ValueError as e:
+            print(f"{y}: スキップしました（{e}）", file=sys.stderr)
+            failed.append(y)
+        finally:
+            w.close()
+        if y in failed: os.remove(path); continue
+        print(f"{y}: {w.rows}行 → {path}")
+    if failed: sys.exit(f"ヘッダー不一致のため書き出せなかった年: {', '.join(failed)}")
+
+def _read_chunks(path, chunk_rows):
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext == "csv":
+        yield from pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+    elif ext == "jsonl":
+        yield from pd.read_json(path, lines=True, dtype=False, convert_dates=False, chunksize=chunk_rows)
+    elif ext == "parquet":
+        _, pq = _parquet()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        sys.exit(f"未対応の拡張子です: {path}（{', '.join(FORMATS)}）")
+
+def import_archive(paths, spreadsheet_name="care-log", replace=False, strict=False, chunk_rows=1000, batch_rows=2000, dry_run=False):
+    # 行の日付の年ごとにシートへ振り分け、batch_rows 行たまるごとに1回だけ append する
+    sheets, buffers, cleared = {}, {}, set()
+    n_ok = n_ng = calls = 0
+
+    def flush(year, final=False):
+        # 途中では満杯のバッチだけを送り、端数は最後の flush まで持ち越す
+        nonlocal calls
+        buf = buffers.get(year, [])
+        n = len(buf) if final else len(buf) // batch_rows * batch_rows
+        vals, buffers[year] = buf[:n], buf[n:]
+        if not vals or dry_run: return
+        if year not in sheets: sheets[year] = get_sheet(spreadsheet_name, year)
+        if replace and year not in cleared:
+            clear_data_rows(sheets[year]); cleared.add(year); calls += 1
+        calls += append_rows_batched(sheets[year], vals, batch_rows)
+
+    for path in paths:
+        offset = 0
+        for chunk in _read_chunks(path, chunk_rows):
+            chunk.index = range(offset, offset + len(chunk)); offset += len(chunk)
+            good, errors = validate_rows(chunk)
+            for i, cols in errors:
+                print(f"{path}:{i + 2}: 不正な値 {cols}", file=sys.stderr)
+            if errors and strict: sys.exit("--strict のため中断しました（書き込み済みの分はそのままです）")
+            n_ok += len(good); n_ng += len(errors)
+            years = pd.to_datetime(good["日付"], format="mixed").dt.year.astype(str)
+            for y, part in good.groupby(years, sort=True):
+                buffers.setdefault(y, []).extend(normalize_rows(part))
+                if len(buffers[y]) >= batch_rows: flush(y)
+    for y in sorted(buffers): flush(y, final=True)
+    print(f"取込 {n_ok}行 / スキップ {n_ng}行 / 書き込みAPI {calls}回" + ("（dry-run）" if dry_run else ""))
+    if sheets:
+        print("※ 起動中のアプリは過去年を最大 CLOSED_YEAR_TTL（24時間）キャッシュします。"
+              "すぐ反映するにはサイドバーの「🔄 データを再読み込み」を押すか、アプリを再起動してください。")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="care-log のエクスポート/インポート")
+    ap.add_argument("--spreadsheet", default="care-log")
+    ap.add_argument("--chunk-rows", type=int, default=1000)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="年別シートをファイルへ書き出す")
+    ex.add_argument("out_dir")
+    ex.add_argument("--format", choices=FORMATS, default="csv")
+    ex.add_argument("--years", nargs="*", help="対象年（省略時は全年）")
+    im = sub.add_parser("import", help="ファイルを検証して年別シートへ書き込む")
+    im.add_argument("paths", nargs="+")
+    im.add_argument("--replace", action="store_true", help="対象年の既存データ行を消してから書き込む")
+    im.add_argument("--strict", action="store_true", help="不正な行があれば中断する")
+    im.add_argument("--batch-rows", type=int, default=2000)
+    im.add_argument("--dry-run", action="store_true", help="検証のみ行い書き込まない")
+    a = ap.parse_args(argv)
+    if a.cmd == "export":
+        export_archive(a.out_dir, a.format, a.spreadsheet, a.years, a.chunk_rows)
+    else:
+        import_archive(a.paths, a.spreadsheet, a.replace, a.strict, a.chunk_rows, a.batch_rows, a.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,13 @@ import os
 
 # 親ディレクトリのutils.pyを読み込むためのパス追加
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils import load_data
+from utils import load_latest_records, reload_button
 
 st.set_page_config(page_title="内省レポート", layout="wide")
+reload_button()
 
-# データ読み込み
-df = load_data()
+# データ読み込み（最新30件。今年分で足りなければ前年シートも読む）
+df = load_latest_records(30)
 
 # 日付をdatetime型に変換
 df["日付"] = pd.to_datetime(df["日付"])
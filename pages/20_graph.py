@@ -4,7 +4,7 @@ import pandas as pd
 import altair as alt
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from utils import load_data, hhmm_to_minutes, signed_circ_diff_minutes, require_passcode
+from utils import load_range, hhmm_to_minutes, signed_circ_diff_minutes, require_passcode, reload_button, lagged_correlation
 
 JST = ZoneInfo('Asia/Tokyo')
 
@@ -12,6 +12,7 @@ st.set_page_config(page_title='睡眠ダッシュボード', page_icon='⏰', la
 st.title('⏰ 睡眠ダッシュボード')
 
 require_passcode(page_name='graph')
+reload_button('care-log')
 
 # 期間切替
 opts = ['7日','30日','90日','期間指定']
@@ -23,15 +24,8 @@ if sel == '期間指定':
     with c1: start_override = st.date_input('開始日', value=today - timedelta(days=29))
     with c2: end_override = st.date_input('終了日', value=today)
 
-# データ読込（直近2年結合→なければ現在年）
-this_year = datetime.now(JST).year
-dfs = []
-for y in (this_year-1, this_year):
-    try:
-        d = load_data('care-log', str(y))
-        if not d.empty: dfs.append(d)
-    except Exception: pass
-df = pd.concat(dfs, ignore_index=True) if dfs else load_data('care-log', None)
+# データ読込（全年シート。過去年は不変として無期限キャッシュ、今年のみ再取得）
+df = load_range(None, None, 'care-log')
 
 if df is None or df.empty or '日付' not in df.columns:
     st.info('まだデータがありません。まずは入力ページから保存してください。'); st.stop()
@@ -77,8 +71,8 @@ def hourly_guides(ymin=-5, ymax=5):
     zero = alt.Chart(pd.DataFrame({'y':[0]})).mark_rule(strokeDash=[6,4], opacity=0.8).encode(y='y:Q')
     return grid + zero
 
-# ==== タブ: Graph1 & Graph2 ====
-tab1, tab2 = st.tabs(['Graph1（偏差/時間）','Graph2（相関）'])
+# ==== タブ: Graph1 & Graph2 & Graph3 ====
+tab1, tab2, tab3 = st.tabs(['Graph1（偏差/時間）','Graph2（相関）','Graph3（ラグ相関）'])
 
 with tab1:
     sub1, sub2 = st.tabs(['偏差（就寝/起床＋睡眠時間）','睡眠時間（参考）'])
@@ -207,3 +201,29 @@ with tab2:
             st.altair_chart(scatter + reg, use_container_width=True)
         else:
             st.caption('相関を描くには有効なデータ点が不足しています。')
+
+with tab3:
+    st.caption('全期間のデータで、睡眠指標（睡眠時間・就寝/起床偏差）とTLX各次元の相関 r をラグ −3〜+3日で算出します。ラグ+1は「翌日のTLX」との相関。区間はブートストラップのパーセンタイル信頼区間。')
+    c1, c2 = st.columns(2)
+    n_boot = c1.select_slider('ブートストラップ回数', options=[0, 200, 1000, 2000], value=1000)
+    ci = c2.select_slider('信頼水準', options=[0.8, 0.9, 0.95, 0.99], value=0.95)
+    lag_df = lagged_correlation(df, n_boot=n_boot, ci=ci)
+    if lag_df.empty:
+        st.caption('相関を計算するには有効なデータ点が不足しています。')
+    else:
+        lag_df = lag_df.assign(有意=lambda d: (d['下限'] > 0) | (d['上限'] < 0))
+        base = alt.Chart(lag_df).encode(
+            x=alt.X('ラグ(日):O', title='ラグ（日）'),
+            y=alt.Y('TLX:N', sort=None, title=None),
+        )
+        heat = base.mark_rect().encode(
+            color=alt.Color('r:Q', scale=alt.Scale(scheme='redblue', domain=[-1, 1], reverse=True), title='r'),
+            tooltip=['睡眠指標:N','TLX:N','ラグ(日):O',alt.Tooltip('r:Q', format='.3f'),alt.Tooltip('下限:Q', format='.3f'),alt.Tooltip('上限:Q', format='.3f'),'n:Q']
+        )
+        text = base.mark_text(fontSize=11).encode(
+            text=alt.Text('r:Q', format='.2f'),
+            opacity=alt.condition('datum.有意', alt.value(1.0), alt.value(0.35))
+        )
+        chart = (heat + text).properties(width=260, height=220).facet(column=alt.Column('睡眠指標:N', sort=None, title=None))
+        st.altair_chart(chart)
+        st.caption('数値が濃い表示のセルは、信頼区間が0を含まない組み合わせです。')
@@ -1,14 +1,23 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
+import numpy as np
 import pandas as pd
+import os
+import re
+import json
+import logging
+import time
+import threading
+import warnings
 import gspread
 from google.oauth2.service_account import Credentials
-from gspread.exceptions import WorksheetNotFound
+from gspread.exceptions import WorksheetNotFound, APIError
 from gspread.utils import rowcol_to_a1
 from datetime import datetime, date, time as _time
 from zoneinfo import ZoneInfo
 
 JST = ZoneInfo("Asia/Tokyo")
+logger = logging.getLogger(__name__)
 
 EXPECTED_HEADERS = [
     "日付","就寝時刻","起床時刻","睡眠時間",
@@ -16,6 +25,23 @@ EXPECTED_HEADERS = [
     "努力度（Effort）","成果満足度（Performance）","フラストレーション（Frustration）",
     "体調サイン","取り組んだこと","ストレッサー","シノアのコメント","桂花のコメント",
 ]
+TLX_COLS = EXPECTED_HEADERS[4:10]
+
+ANOMALY_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".care_anomalies.json")
+ANOMALY_METRICS = ["睡眠時間(h)", "就寝偏差(h)", "起床偏差(h)", *TLX_COLS]
+ANOMALY_WINDOW, ANOMALY_MIN_N, ANOMALY_Z = 60, 14, 3.5
+# 尺度の下限（窓内が一定でMAD=0でも、これを超えるずれは検出できるように）
+# 睡眠は15分刻み入力の1目盛、TLXは0.5点
+ANOMALY_MIN_SCALE = {"睡眠時間(h)": 0.25, "就寝偏差(h)": 0.25, "起床偏差(h)": 0.25, **{c: 0.5 for c in TLX_COLS}}
+
+# Sheets API の書き込み上限（60回/分/ユーザー）に収まる間隔
+API_MIN_INTERVAL, API_MAX_RETRIES = 1.1, 6
+
+# 全セッション（スレッド）で共有する読み込みキャッシュの有効期間（秒）
+CACHE_TTL = 300
+# 締まった過去年は不変とみなすが、別プロセス（archive.py import など）の書き込みも
+# いずれ反映されるよう有限にしておく。すぐ反映したいときは reload_data() を使う
+CLOSED_YEAR_TTL = 24 * 3600
 
 @st.cache_resource
 def get_gspread_client():
@@ -40,12 +66,54 @@ def _ensure_ws(sh, title):
         _force_header(ws)
     return ws
 
+# ===== セッション間の共有（Streamlitはセッションごとに別スレッド） =====
+_locks_guard = threading.Lock()
+_ws_locks, _ws_handles = {}, {}
+_cache, _cache_gen, _inflight = {}, {}, {}
+_anomaly_lock = threading.Lock()
+
+def _ws_lock(key):
+    # ワークシート単位の書き込みロック。ヘッダー修復と書き込みは必ずこの中で行う
+    with _locks_guard:
+        return _ws_locks.setdefault(key, threading.RLock())
+
+def _ws_key(spreadsheet_name, worksheet_name):
+    return (spreadsheet_name, worksheet_name or str(datetime.now(JST).year))
+
+def _single_flight(key, fn):
+    # 同じ key の処理が実行中なら、新たに呼ばずにその結果を待って共有する
+    with _locks_guard:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader: call = _inflight[key] = {"done": threading.Event()}
+    if not leader:
+        call["done"].wait()
+        if "error" in call: raise call["error"]
+        return call["result"]
+    try:
+        call["result"] = fn()
+        return call["result"]
+    except BaseException as e:
+        call["error"] = e; raise
+    finally:
+        with _locks_guard: _inflight.pop(key, None)
+        call["done"].set()
+
+def invalidate_cache(spreadsheet_name="care-log", worksheet_name=None):
+    key = _ws_key(spreadsheet_name, worksheet_name)
+    with _locks_guard:
+        _cache.pop(key, None)
+        _cache_gen[key] = _cache_gen.get(key, 0) + 1
+
 def get_sheet(spreadsheet_name="care-log", worksheet_name=None):
-    client = get_gspread_client()
-    sh = client.open(spreadsheet_name)
-    if worksheet_name is None:
-        worksheet_name = str(datetime.now(JST).year)
-    return _ensure_ws(sh, worksheet_name)
+    key = _ws_key(spreadsheet_name, worksheet_name)
+    ws = _ws_handles.get(key)
+    if ws is not None: return ws
+    with _ws_lock(key):
+        if key not in _ws_handles:
+            sh = get_gspread_client().open(spreadsheet_name)
+            _ws_handles[key] = _ensure_ws(sh, key[1])
+        return _ws_handles[key]
 
 def hhmm_to_minutes(s):
     if not s or not isinstance(s, str): return None
@@ -70,8 +138,82 @@ def calculate_sleep_duration(sleep_time: _time, wake_time: _time) -> float:
     w = wake_time.hour*60 + wake_time.minute
     return round(((w - s) % 1440) / 60.0, 2)
 
+def hhmm_series_to_minutes(s: pd.Series) -> pd.Series:
+    hm = s.astype("string").str.extract(r"^\s*(\d{1,2}):(\d{1,2})")
+    h = pd.to_numeric(hm[0], errors="coerce"); m = pd.to_numeric(hm[1], errors="coerce")
+    return (h % 24) * 60 + (m % 60)
+
+def sleep_metrics_frame(df, base_sleep=21*60, base_wake=4*60) -> pd.DataFrame:
+    # 1日1行（同日複数保存は最後の行）・暦日で欠損日を埋めた睡眠指標/TLX表
+    d = df.copy()
+    for c in EXPECTED_HEADERS:
+        if c not in d.columns: d[c] = ""
+    d["日付"] = pd.to_datetime(d["日付"], errors="coerce").dt.normalize()
+    d = d.dropna(subset=["日付"]).sort_values("日付", kind="stable").drop_duplicates("日付", keep="last")
+    s, w = hhmm_series_to_minutes(d["就寝時刻"]), hhmm_series_to_minutes(d["起床時刻"])
+    def circ(m, base):
+        x = (m - base) % 1440
+        return x.where(x < 720, x - 1440) / 60.0
+    out = pd.DataFrame({
+        "睡眠時間(h)": pd.to_numeric(d["睡眠時間"], errors="coerce").fillna(((w - s) % 1440) / 60.0),
+        "就寝偏差(h)": circ(s, base_sleep),
+        "起床偏差(h)": circ(w, base_wake),
+    })
+    for c in TLX_COLS:
+        out[c] = pd.to_numeric(d[c], errors="coerce")
+    out.index = d["日付"]
+    if out.empty: return out
+    return out.reindex(pd.date_range(out.index.min(), out.index.max(), freq="D"))
+
+def _weighted_pearson(W, X, Y):
+    # W: (B,N) 各行の重み（ブートストラップの出現回数）, X: (N,S), Y: (N,D) → r: (B,S,D), n: (S,D)
+    N, S, D = len(X), X.shape[1], Y.shape[1]
+    vx, vy = ~np.isnan(X), ~np.isnan(Y)
+    M = (vx[:, :, None] & vy[:, None, :]).astype(W.dtype)
+    x, y = np.where(vx, X, 0.0)[:, :, None], np.where(vy, Y, 0.0)[:, None, :]
+    A = np.concatenate([a.reshape(N, -1) for a in (M, M*x, M*y, M*x*x, M*y*y, M*x*y)], axis=1).astype(W.dtype)
+    n, sx, sy, sxx, syy, sxy = np.split((W @ A).astype(float), 6, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        den = np.sqrt((n*sxx - sx*sx) * (n*syy - sy*sy))
+        r = np.where((n > 2) & (den > 0), (n*sxy - sx*sy) / den, np.nan)
+    return r.reshape(len(W), S, D), M.sum(axis=0)
+
 @st.cache_data(show_spinner=False)
-def load_data(spreadsheet_name="care-log", worksheet_name=None):
+def lagged_correlation(df, lags=tuple(range(-3, 4)), n_boot=1000, ci=0.95, seed=0) -> pd.DataFrame:
+    """睡眠指標×TLX各次元のラグ付き相関 r とブートストラップ信頼区間（パーセンタイル法）。
+    ラグ k は「k日後のTLX」と「当日の睡眠」の組（k<0 は過去のTLX）。"""
+    daily = sleep_metrics_frame(df)
+    sleep_cols = ["睡眠時間(h)", "就寝偏差(h)", "起床偏差(h)"]
+    cols = ["睡眠指標", "TLX", "ラグ(日)", "r", "下限", "上限", "n"]
+    if daily.empty: return pd.DataFrame(columns=cols)
+    X, Y = daily[sleep_cols].to_numpy(float), daily[TLX_COLS].to_numpy(float)
+    # 中心化しておくと float32 の積和でも桁落ちしない（r は平行移動に不変）
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        X, Y = X - np.nanmean(X, axis=0), Y - np.nanmean(Y, axis=0)
+    T, q = len(daily), [(1-ci)/2*100, (1+ci)/2*100]
+    # ポアソン・ブートストラップ：日ごとの重みを1回だけ引き、全ラグで共有する
+    Wall = np.random.default_rng(seed).poisson(1.0, size=(n_boot, T)).astype(np.float32) if n_boot > 0 else None
+    S, D = np.meshgrid(np.arange(len(sleep_cols)), np.arange(len(TLX_COLS)), indexing="ij")
+    parts = []
+    for k in lags:
+        if abs(k) >= T - 2: continue
+        rows = slice(0, T-k) if k >= 0 else slice(-k, T)
+        Xk, Yk = X[rows], (Y[k:] if k >= 0 else Y[:T+k])
+        r, n = _weighted_pearson(np.ones((1, len(Xk))), Xk, Yk)
+        lo, hi = np.full_like(r[0], np.nan), np.full_like(r[0], np.nan)
+        if Wall is not None:
+            rb, _ = _weighted_pearson(Wall[:, rows], Xk, Yk)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                lo, hi = np.nanpercentile(rb, q, axis=0)
+        parts.append(pd.DataFrame({
+            "睡眠指標": np.asarray(sleep_cols)[S.ravel()], "TLX": np.asarray(TLX_COLS)[D.ravel()],
+            "ラグ(日)": k, "r": r[0].ravel(), "下限": lo.ravel(), "上限": hi.ravel(), "n": n.ravel().astype(int),
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=cols)
+
+def _fetch_data(spreadsheet_name, worksheet_name):
     ws = get_sheet(spreadsheet_name, worksheet_name)
     recs = ws.get_all_records()
     df = pd.DataFrame(recs)
@@ -82,9 +224,116 @@ def load_data(spreadsheet_name="care-log", worksheet_name=None):
         df["日付"] = pd.to_datetime(df["日付"], errors="coerce")
     return df
 
-def save_to_google_sheets(df, spreadsheet_name="care-log", worksheet_name=None):
-    if df is None or df.empty: return
-    ws = get_sheet(spreadsheet_name, worksheet_name)
+def _partition_ttl(title):
+    # 締まった過去年のシートは CLOSED_YEAR_TTL、それ以外は CACHE_TTL
+    if re.fullmatch(r"\d{4}", title) and int(title) < datetime.now(JST).year: return CLOSED_YEAR_TTL
+    return CACHE_TTL
+
+def reload_data(spreadsheet_name="care-log"):
+    # このスプレッドシートの全年キャッシュと年シート一覧を破棄する（手動の再読み込み用）
+    with _locks_guard:
+        _cache.pop(("years", spreadsheet_name), None)
+        # 取得中の読み込みが古い結果を書き戻さないよう、世代だけ持つキーも対象にする
+        keys = {k for k in [*_cache, *_cache_gen] if k[0] == spreadsheet_name}
+    for k in keys: invalidate_cache(*k)
+
+def reload_button(spreadsheet_name="care-log"):
+    # 他の端末や archive.py で過去年を書き換えたときに、キャッシュを待たず反映する
+    with st.sidebar:
+        if st.button("🔄 データを再読み込み"):
+            reload_data(spreadsheet_name)
+            st.rerun()
+
+def load_data(spreadsheet_name="care-log", worksheet_name=None):
+    key = _ws_key(spreadsheet_name, worksheet_name)
+    hit = _cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < _partition_ttl(key[1]):
+        return hit[1].copy()
+    gen = _cache_gen.get(key, 0)
+    def fetch():
+        df = _fetch_data(*key)
+        with _locks_guard:
+            # 取得中に書き込みがあった場合は古い結果をキャッシュしない
+            if _cache_gen.get(key, 0) == gen: _cache[key] = (time.monotonic(), df)
+        return df
+    # 世代をキーに含め、書き込み後に始まった読み込みが書き込み前の取得に相乗りしないようにする
+    return _single_flight(("load",) + key + (gen,), fetch).copy()
+
+def _read_anomaly_store(path=ANOMALY_STORE):
+    try:
+        with open(path, encoding="utf-8") as f: return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError): return {}
+
+def _write_anomaly_store(store, path=ANOMALY_STORE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(store, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _robust_z(x, window, metric=None):
+    # 直近 ANOMALY_WINDOW 日の中央値/MAD による修正zスコア（窓は固定長なので1日あたりO(1)）
+    vals = np.array([v for _, v in window], dtype=float)
+    if len(vals) < ANOMALY_MIN_N: return None, None, None
+    med = float(np.median(vals))
+    mad = float(np.median(np.abs(vals - med))) * 1.4826
+    if mad == 0: mad = float(np.mean(np.abs(vals - med))) * 1.2533
+    mad = max(mad, ANOMALY_MIN_SCALE.get(metric, 0.0))
+    if mad == 0: return med, mad, (0.0 if x == med else float("inf") * np.sign(x - med))
+    return med, mad, (x - med) / mad
+
+def detect_anomalies(df, spreadsheet_name="care-log", path=ANOMALY_STORE, z=ANOMALY_Z):
+    # 新しく保存された日を1日ずつ判定し、状態とアラートをローカルストアへ追記
+    store = _read_anomaly_store(path)
+    book = store.setdefault(spreadsheet_name, {"state": {}, "alerts": []})
+    state, alerts, found = book["state"], book["alerts"], []
+    daily = sleep_metrics_frame(df).dropna(how="all")
+    for day, row in daily.iterrows():
+        d = day.date().isoformat()
+        alerts[:] = [a for a in alerts if a["日付"] != d]
+        for m in ANOMALY_METRICS:
+            x = row[m]
+            if pd.isna(x): continue
+            win = state.setdefault(m, [])
+            if win and win[-1][0] == d: win.pop()
+            med, mad, score = _robust_z(float(x), win, m)
+            if score is not None and abs(score) >= z:
+                found.append({"日付": d, "指標": m, "値": float(x), "中央値": med, "MAD": mad, "z": round(score, 2)})
+            if not win or win[-1][0] < d:
+                win.append([d, float(x)])
+                del win[:-ANOMALY_WINDOW]
+    alerts.extend(found)
+    _write_anomaly_store(store, path)
+    return found
+
+def rebuild_anomaly_state(df, spreadsheet_name="care-log", path=ANOMALY_STORE):
+    # 既存履歴から状態を作り直す（初回やストア破損時の一括バックフィル）
+    store = _read_anomaly_store(path)
+    store.pop(spreadsheet_name, None)
+    _write_anomaly_store(store, path)
+    return detect_anomalies(df, spreadsheet_name, path)
+
+def load_anomalies(start=None, end=None, spreadsheet_name="care-log", path=ANOMALY_STORE) -> pd.DataFrame:
+    cols = ["日付", "指標", "値", "中央値", "MAD", "z"]
+    alerts = _read_anomaly_store(path).get(spreadsheet_name, {}).get("alerts", [])
+    out = pd.DataFrame(alerts, columns=cols)
+    out["日付"] = pd.to_datetime(out["日付"], errors="coerce")
+    if start is not None: out = out[out["日付"] >= pd.to_datetime(start)]
+    if end is not None: out = out[out["日付"] <= pd.to_datetime(end)]
+    return out.sort_values("日付", ascending=False).reset_index(drop=True)
+
+# 入力ページの列名 → シートの列名（区間1の就寝/起床と、全区間の合計睡眠）
+INPUT_COLUMN_MAP = {"就寝1": "就寝時刻", "起床1": "起床時刻", "総睡眠（時間）": "睡眠時間"}
+
+def from_input_columns(df):
+    df = df.copy()
+    for src, dst in INPUT_COLUMN_MAP.items():
+        if src not in df.columns: continue
+        cur = df[dst].astype(object) if dst in df.columns else pd.Series("", index=df.index, dtype=object)
+        blank = cur.isna() | (cur.astype(str).str.strip() == "")
+        df[dst] = cur.where(~blank, df[src].astype(object))
+    return df
+
+def normalize_rows(df):
+    df = from_input_columns(df)
     for c in EXPECTED_HEADERS:
         if c not in df.columns: df[c] = ""
     df = df[EXPECTED_HEADERS]
@@ -96,9 +345,155 @@ def save_to_google_sheets(df, spreadsheet_name="care-log", worksheet_name=None):
             if isinstance(v, str): return v
             if isinstance(v, _time): return f"{v.hour:02d}:{v.minute:02d}"
             return ""
-        return "" if v is None else v
-    values = [[norm(c, v) for c, v in zip(df.columns, row)] for row in df.itertuples(index=False, name=None)]
-    ws.append_rows(values, value_input_option="USER_ENTERED")
+        return "" if v is None or (not isinstance(v, str) and pd.isna(v)) else v
+    return [[norm(c, v) for c, v in zip(df.columns, row)] for row in df.itertuples(index=False, name=None)]
+
+def available_years(spreadsheet_name="care-log"):
+    key = ("years", spreadsheet_name)
+    hit = _cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < CACHE_TTL: return hit[1]
+    years = [int(y) for y in _single_flight(key, lambda: list_year_worksheets(spreadsheet_name))]
+    with _locks_guard: _cache[key] = (time.monotonic(), years)
+    return years
+
+def load_range(start=None, end=None, spreadsheet_name="care-log"):
+    # [start, end] を含む年シートだけを読み込んで結合（None は端なし）
+    start = pd.to_datetime(start).normalize() if start is not None else None
+    end = pd.to_datetime(end).normalize() if end is not None else None
+    years = [y for y in available_years(spreadsheet_name)
+             if (start is None or y >= start.year) and (end is None or y <= end.year)]
+    dfs = [load_data(spreadsheet_name, str(y)) for y in years]
+    df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=EXPECTED_HEADERS)
+    df["日付"] = pd.to_datetime(df["日付"], errors="coerce")
+    if start is not None: df = df[df["日付"] >= start]
+    if end is not None: df = df[df["日付"] < end + pd.Timedelta(days=1)]
+    return df.reset_index(drop=True)
+
+def latest_date(spreadsheet_name="care-log"):
+    # 新しい年から順に見て、記録のある最終日を返す（なければ None）
+    for y in sorted(available_years(spreadsheet_name), reverse=True):
+        d = pd.to_datetime(load_data(spreadsheet_name, str(y))["日付"], errors="coerce").max()
+        if pd.notna(d): return d.normalize()
+    return None
+
+def load_latest_records(n, spreadsheet_name="care-log"):
+    # 新しい年から順に読み、日付のある記録が n 件そろった時点で止める（件数基準）
+    dfs, count = [], 0
+    for y in sorted(available_years(spreadsheet_name), reverse=True):
+        d = load_data(spreadsheet_name, str(y))
+        dfs.append(d); count += int(pd.to_datetime(d["日付"], errors="coerce").notna().sum())
+        if count >= n: break
+    if not dfs: return pd.DataFrame(columns=EXPECTED_HEADERS)
+    df = pd.concat(dfs, ignore_index=True)
+    df["日付"] = pd.to_datetime(df["日付"], errors="coerce")
+    return df.dropna(subset=["日付"]).sort_values("日付", kind="stable").tail(n).reset_index(drop=True)
+
+def save_to_google_sheets(df, spreadsheet_name="care-log", worksheet_name=None):
+    if df is None or df.empty: return
+    df = from_input_columns(df)
+    if worksheet_name is None:
+        # 行の日付の年のシートへ振り分ける（年末の記録を年明けに保存しても前年へ入る）
+        dates = df["日付"] if "日付" in df.columns else pd.Series(pd.NaT, index=df.index)
+        years = pd.to_datetime(dates, errors="coerce").dt.year.fillna(datetime.now(JST).year).astype(int)
+        for y, part in df.groupby(years):
+            save_to_google_sheets(part.copy(), spreadsheet_name, str(y))
+        return
+    key = _ws_key(spreadsheet_name, worksheet_name)
+    values = normalize_rows(df)
+    ws = get_sheet(*key)
+    with _ws_lock(key):
+        ws.append_rows(values, value_input_option="USER_ENTERED")
+    invalidate_cache(*key)
+    if key[1] not in map(str, available_years(spreadsheet_name)):
+        with _locks_guard: _cache.pop(("years", spreadsheet_name), None)
+    try:
+        with _anomaly_lock:
+            if spreadsheet_name not in _read_anomaly_store():
+                # 年初でも窓を満たせるよう、年をまたいで直近 ANOMALY_WINDOW 日分から初期化
+                first = pd.to_datetime(df["日付"], errors="coerce").min()
+                if pd.notna(first):
+                    hist = load_range(first - pd.Timedelta(days=ANOMALY_WINDOW), first - pd.Timedelta(days=1), spreadsheet_name)
+                    rebuild_anomaly_state(hist, spreadsheet_name)
+            detect_anomalies(df, spreadsheet_name)
+    except Exception:
+        logger.exception("異常検知に失敗しました（保存自体は完了しています）")
+
+# ===== 一括エクスポート/インポート用（archive.py から利用） =====
+_last_api_call = [0.0]
+
+def call_with_backoff(fn, *args, **kwargs):
+    # 呼び出し間隔を空け、429/5xx は指数バックオフで再試行
+    for i in range(API_MAX_RETRIES):
+        wait = _last_api_call[0] + API_MIN_INTERVAL - time.monotonic()
+        if wait > 0: time.sleep(wait)
+        _last_api_call[0] = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        except APIError as e:
+            code = getattr(getattr(e, "response", None), "status_code", None)
+            if code not in (429, 500, 502, 503) or i == API_MAX_RETRIES - 1: raise
+            time.sleep(min(2 ** i, 32))
+
+def list_year_worksheets(spreadsheet_name="care-log"):
+    sh = get_gspread_client().open(spreadsheet_name)
+    return sorted(ws.title for ws in sh.worksheets() if re.fullmatch(r"\d{4}", ws.title))
+
+def open_sheet_readonly(spreadsheet_name="care-log", worksheet_name=None):
+    # 読み取り専用で開く。_ensure_ws と違いヘッダーを修復しない（不一致は ValueError）
+    title = worksheet_name or str(datetime.now(JST).year)
+    ws = call_with_backoff(get_gspread_client().open(spreadsheet_name).worksheet, title)
+    header = call_with_backoff(ws.row_values, 1)
+    if header != EXPECTED_HEADERS:
+        raise ValueError(f"{title}: ヘッダーが EXPECTED_HEADERS と一致しません: {header}")
+    return ws
+
+def iter_sheet_chunks(spreadsheet_name="care-log", worksheet_name=None, chunk_rows=1000):
+    # ヘッダー以降を chunk_rows 行ずつ読み出す（全件をメモリに載せない）
+    ws = open_sheet_readonly(spreadsheet_name, worksheet_name)
+    last_col = rowcol_to_a1(1, len(EXPECTED_HEADERS)).rstrip("0123456789")
+    # API は範囲ごとに末尾の空行を削って返すため、短いチャンクは終端の目印にならない。
+    # シートの行数（row_count）まで必ず読み切る
+    for r in range(2, ws.row_count + 1, chunk_rows):
+        end = min(r + chunk_rows - 1, ws.row_count)
+        raw = call_with_backoff(ws.get, f"A{r}:{last_col}{end}")
+        rows = [row + [""] * (len(EXPECTED_HEADERS) - len(row)) for row in raw if any(row)]
+        if rows: yield pd.DataFrame(rows, columns=EXPECTED_HEADERS)
+
+def validate_rows(df):
+    # EXPECTED_HEADERS に沿って検証し、(正常行, エラー一覧) を返す
+    missing = [c for c in EXPECTED_HEADERS if c not in df.columns]
+    extra = [c for c in df.columns if c not in EXPECTED_HEADERS]
+    if missing or extra:
+        raise ValueError(f"ヘッダーが一致しません（不足: {missing} / 余分: {extra}）")
+    df = df[EXPECTED_HEADERS].astype("string").fillna("")
+    # 書式は値ごとに判定（先頭行から推定すると、チャンクごとに合否が変わる）
+    dates = pd.to_datetime(df["日付"], errors="coerce", format="mixed")
+    bad = dates.isna().rename("日付")
+    df["日付"] = dates.dt.strftime("%Y-%m-%d").fillna(df["日付"])
+    errs = [bad]
+    for c in ("就寝時刻","起床時刻"):
+        errs.append(((df[c] != "") & ~df[c].str.fullmatch(r"\s*\d{1,2}:\d{2}(:\d{2})?\s*")).rename(c))
+    for c in ["睡眠時間", *TLX_COLS]:
+        v = pd.to_numeric(df[c].replace("", None), errors="coerce")
+        ng = (df[c] != "") & v.isna()
+        if c in TLX_COLS: ng |= (v < 0) | (v > 10)
+        errs.append(ng.rename(c))
+    flags = pd.concat(errs, axis=1)
+    ng_rows = flags.any(axis=1)
+    errors = [(i, list(flags.columns[flags.loc[i]])) for i in flags.index[ng_rows]]
+    return df[~ng_rows], errors
+
+def clear_data_rows(ws):
+    # ヘッダー行は残して値だけ消す（resize しないので行数は変わらない）
+    call_with_backoff(ws.batch_clear, ["A2:ZZ"])
+
+def append_rows_batched(ws, values, batch_rows=2000):
+    # 戻り値はAPI呼び出し回数
+    calls = 0
+    for i in range(0, len(values), batch_rows):
+        call_with_backoff(ws.append_rows, values[i:i+batch_rows], value_input_option="USER_ENTERED", table_range="A1")
+        calls += 1
+    return calls
 
 def load_today_record(spreadsheet_name="care-log", worksheet_name=None):
     df = load_data(spreadsheet_name, worksheet_name)